@@ -1,6 +1,6 @@
 import streamlit as st
 import pandas as pd
-from npi_utils import process_dataframe
+from npi_utils import process_dataframe, DEFAULT_CACHE_DIR
 from config import auto_detect_columns, validate_required_fields, COLUMN_MAPPINGS
 import io
 import chardet
@@ -141,6 +141,20 @@ if uploaded_file is not None:
 
             user_mappings[key] = st.selectbox(label, options=column_options, index=default_index)
 
+        # --- Lookup Options ---
+        use_cache = st.checkbox(
+            "Reuse NPI Registry results from earlier runs",
+            value=False,
+            help=f"Keeps registry responses for a week in the '{DEFAULT_CACHE_DIR}' folder "
+                 "(requires the diskcache package), so re-running the same file skips repeated lookups."
+        )
+        force_refresh = st.checkbox(
+            "Refresh saved results",
+            value=False,
+            disabled=not use_cache,
+            help="Look every provider up again and replace the saved responses."
+        )
+
         # --- Processing Logic ---
         if st.button("Process File"):
             # Create a new dataframe with standardized column names
@@ -165,7 +179,11 @@ if uploaded_file is not None:
                             progress_bar.progress(fraction)
 
                         # Process the dataframe
-                        results_df = process_dataframe(mapped_df, final_mappings, progress_callback=update_progress)
+                        results_df = process_dataframe(
+                            mapped_df, final_mappings, progress_callback=update_progress,
+                            cache_dir=DEFAULT_CACHE_DIR if use_cache else None,
+                            force_refresh=use_cache and force_refresh
+                        )
 
                         st.success(f"Processing complete! Found {len(results_df)} total matches.")
                         st.write("### Results")
@@ -1,59 +1,515 @@
 import pandas as pd
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import time
 from typing import List, Dict, Set
 import json
+import logging
 import re
+import threading
 import os
+import random
 import unicodedata
+from functools import lru_cache
+from collections import OrderedDict, namedtuple
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
+from itertools import chain
+
+logger = logging.getLogger(__name__)
+
+try:
+    # orjson decodes the registry's large JSON payloads several times faster
+    import orjson
+    _json_loads = orjson.loads
+except ImportError:
+    _json_loads = json.loads
+
+try:
+    # diskcache persists registry responses between runs
+    from diskcache import Cache
+except ImportError:
+    Cache = None
+
+# Registry records (summed over cached responses, an empty response counting as
+# one) kept in memory by an NPILookup; a full page holds 200 records, so this
+# bounds the cache to about 50 full pages however many providers are looked up
+MEMORY_CACHE_RECORDS = 10_000
+
+# On-disk response cache settings (used only when diskcache is installed and a
+# cache directory is given; DEFAULT_CACHE_DIR is where the app keeps it)
+DEFAULT_CACHE_DIR = '.npi_cache'
+CACHE_SIZE_LIMIT = 1 << 30  # 1 GiB
+CACHE_EXPIRE_SECONDS = 7 * 24 * 60 * 60  # Cached responses go stale after a week
+
+# Concurrency limits: rows looked up in parallel, and registry requests in flight
+MAX_WORKERS = 8
+MAX_CONCURRENT_REQUESTS = 8
+
+# Input rows looked up per chunk when results are produced in chunks
+CHUNK_SIZE = 10_000
+# Providers looked up between INFO-level progress messages
+PROGRESS_LOG_INTERVAL = 100
+
+# Identifies this tool's requests to the registry
+USER_AGENT = 'npi_automation_tool'
+
+# Registry rate limiting and retry back-off for rate-limited/failed requests
+MAX_REQUESTS_PER_SECOND = 10
+MAX_RETRIES = 5
+RETRY_BACKOFF_BASE = 0.5  # Seconds, doubled on each attempt
+RETRY_BACKOFF_CAP = 30.0
+# Seconds to wait for a registry connection and for each read of its response
+REQUEST_TIMEOUT = (5, 30)
+# Registry server errors retried by the HTTP session itself
+RETRY_STATUS_CODES = (500, 502, 503, 504)
+
+# Distinct non-ASCII strings whose accent-stripped form is remembered
+TEXT_CACHE_SIZE = 100_000
+
+# Matches anything that is not an ASCII digit (used to normalize ZIP codes)
+_NONDIGIT_RE = re.compile(r'[^0-9]')
+# str.translate table deleting every ASCII character except the digits
+_ASCII_NONDIGIT_DELETE = str.maketrans('', '', ''.join(
+    chr(c) for c in range(128) if not chr(c).isdigit()
+))
+
+# US states for address validation, shared by all NPILookup instances
+US_STATES = frozenset({
+    'AL', 'AK', 'AZ', 'AR', 'CA', 'CO', 'CT', 'DE', 'FL', 'GA',
+    'HI', 'ID', 'IL', 'IN', 'IA', 'KS', 'KY', 'LA', 'ME', 'MD',
+    'MA', 'MI', 'MN', 'MS', 'MO', 'MT', 'NE', 'NV', 'NH', 'NJ',
+    'NM', 'NY', 'NC', 'ND', 'OH', 'OK', 'OR', 'PA', 'RI', 'SC',
+    'SD', 'TN', 'TX', 'UT', 'VT', 'VA', 'WA', 'WV', 'WI', 'WY',
+    'DC', 'PR'
+})
+
+# Column names that mark a file as institutions, and words in column names
+# that suggest one when the provider type is otherwise unclear
+INSTITUTION_NAME_COLUMNS = frozenset({'institution_name', 'organization_name', 'facility_name', 'org_name'})
+INSTITUTION_INDICATOR_RE = re.compile(r'facility|hospital|clinic|center|institution|organization',
+                                      re.IGNORECASE)
+
+# Upper-cased match fields compared by the search strategy verifiers
+Candidate = namedtuple('Candidate', [
+    'first_name', 'last_name', 'addresses', 'address_states', 'locations', 'location_states'
+])
+
+def pack_candidates(matches: List[Dict]) -> List[Candidate]:
+    """
+    Normalize the fields the strategy verifiers compare, once per search result.
+    `addresses` is the set of (city, state) pairs from the match's addresses,
+    while `locations` also includes practice locations and endpoints; the
+    *_states sets hold just their states.
+    """
+    candidates = []
+    for m in matches:
+        basic = m['basic']
+        addresses = frozenset(
+            (a.get('city', '').upper(), a.get('state', '').upper())
+            for a in m.get('addresses', ())
+        )
+        locations = addresses.union(
+            (a.get('city', '').upper(), a.get('state', '').upper())
+            for a in chain(m.get('practiceLocations', ()), m.get('endpoints', ()))
+        )
+        candidates.append(Candidate(
+            basic.get('first_name', '').upper(),
+            basic.get('last_name', '').upper(),
+            addresses,
+            frozenset(state for _, state in addresses),
+            locations,
+            frozenset(state for _, state in locations)
+        ))
+    return candidates
+
+# Upper-cased provider fields compared by the search strategy verifiers, whether
+# a first name was given, and the location check chosen for the provider's
+# city/state (see LOCATION_VERIFIERS)
+ProviderFields = namedtuple('ProviderFields', [
+    'first_name', 'last_name', 'city', 'state', 'has_first_name', 'verify_location'
+])
+
+def _verify_name_city_state(c: Candidate, p: ProviderFields) -> bool:
+    return (c.first_name == p.first_name and c.last_name == p.last_name and
+            (p.city, p.state) in c.addresses)
+
+def _verify_name_state(c: Candidate, p: ProviderFields) -> bool:
+    return (c.first_name == p.first_name and c.last_name == p.last_name and
+            p.state in c.address_states)
+
+def _verify_last_name_city_state(c: Candidate, p: ProviderFields) -> bool:
+    return c.last_name == p.last_name and (p.city, p.state) in c.addresses
+
+def _verify_last_name_state(c: Candidate, p: ProviderFields) -> bool:
+    return c.last_name == p.last_name and p.state in c.address_states
+
+# Location checks for the name-only strategies, across all of the match's locations
+def _located_in_city_state(c: Candidate, p: ProviderFields) -> bool:
+    return (p.city, p.state) in c.locations
+
+def _located_in_state(c: Candidate, p: ProviderFields) -> bool:
+    return p.state in c.location_states
+
+def _located_anywhere(c: Candidate, p: ProviderFields) -> bool:
+    return True
+
+def _never_located(c: Candidate, p: ProviderFields) -> bool:
+    return False
+
+# Location check by which of (city, state) the provider has, picked once per row:
+# city+state must both match, state alone must match, no location accepts the
+# name match only, and a city without a state can't be verified
+LOCATION_VERIFIERS = {
+    (True, True): _located_in_city_state,
+    (False, True): _located_in_state,
+    (False, False): _located_anywhere,
+    (True, False): _never_located,
+}
+
+def _verify_name_location(c: Candidate, p: ProviderFields) -> bool:
+    # First verify name match, then location if city or state was provided
+    return (c.first_name == p.first_name and c.last_name == p.last_name and
+            p.verify_location(c, p))
+
+def _verify_last_name_location(c: Candidate, p: ProviderFields) -> bool:
+    return (
+        # Verify last name match
+        c.last_name == p.last_name and
+        # If first name provided (valid non-NaN), verify it matches
+        (not p.has_first_name or c.first_name == p.first_name) and
+        # Verify location if provided
+        p.verify_location(c, p)
+    )
+
+# Search combinations for individuals, from most specific to least specific. Each
+# strategy searches on its required fields and keeps the matches its verifier accepts.
+SEARCH_STRATEGIES = (
+    # Strategy 1: First name, last name, city, and state (most specific)
+    {
+        'required_fields': ('first_name', 'last_name', 'city', 'state'),
+        'verify': _verify_name_city_state
+    },
+    # Strategy 2: First name, last name, and state
+    {
+        'required_fields': ('first_name', 'last_name', 'state'),
+        'verify': _verify_name_state
+    },
+    # Strategy 3: Last name, city, and state
+    {
+        'required_fields': ('last_name', 'city', 'state'),
+        'verify': _verify_last_name_city_state
+    },
+    # Strategy 4: Last name and state
+    {
+        'required_fields': ('last_name', 'state'),
+        'verify': _verify_last_name_state
+    },
+    # Strategy 5: First name and last name with location verification
+    {
+        'required_fields': ('first_name', 'last_name'),
+        'verify': _verify_name_location
+    },
+    # Strategy 6: Last name only (broadest search - limited to 10 results)
+    {
+        'required_fields': ('last_name',),
+        'verify': _verify_last_name_location,
+        'limit': 10  # Limit to first 10 results for last name only searches
+    },
+)
+
+# Output schema per provider type, in column order. Each column is read from
+# the match record ('match'), its 'basic' section, the chosen address, the first
+# taxonomy, or the result details computed while matching ('result').
+INSTITUTION_FIELDS = (
+    ('organization_name', 'basic', 'organization_name'),
+    ('npi', 'match', 'number'),
+    ('address', 'address', 'address_1'),
+    ('address_2', 'address', 'address_2'),
+    ('city', 'address', 'city'),
+    ('state', 'address', 'state'),
+    ('zip', 'address', 'postal_code'),
+    ('phone', 'address', 'telephone_number'),
+    ('fax', 'address', 'fax_number'),
+    ('organizational_subpart', 'basic', 'organizational_subpart'),
+    ('authorized_official_first_name', 'basic', 'authorized_official_first_name'),
+    ('authorized_official_last_name', 'basic', 'authorized_official_last_name'),
+    ('authorized_official_title', 'basic', 'authorized_official_title'),
+    ('status', 'basic', 'status'),
+    ('taxonomy_desc', 'taxonomy', 'desc'),
+    ('taxonomy_group', 'taxonomy', 'taxonomy_group'),
+    ('address_type', 'result', 'address_type'),
+    ('search_criteria_used', 'match', 'search_criteria'),
+)
+INDIVIDUAL_FIELDS = (
+    ('first_name', 'basic', 'first_name'),
+    ('last_name', 'basic', 'last_name'),
+    ('npi', 'match', 'number'),
+    ('address', 'address', 'address_1'),
+    ('address_2', 'address', 'address_2'),
+    ('city', 'address', 'city'),
+    ('state', 'address', 'state'),
+    ('zip', 'address', 'postal_code'),
+    ('phone', 'address', 'telephone_number'),
+    ('fax', 'address', 'fax_number'),
+    ('middle_name', 'basic', 'middle_name'),
+    ('name_prefix', 'basic', 'name_prefix'),
+    ('name_suffix', 'basic', 'name_suffix'),
+    ('credential', 'basic', 'credential'),
+    ('gender', 'basic', 'gender'),
+    ('sole_proprietor', 'basic', 'sole_proprietor'),
+    ('status', 'basic', 'status'),
+    ('taxonomy_desc', 'taxonomy', 'desc'),
+    ('taxonomy_group', 'taxonomy', 'taxonomy_group'),
+    ('license_number', 'taxonomy', 'license'),
+    ('license_state', 'taxonomy', 'state'),
+    ('address_type', 'result', 'address_type'),
+    ('search_criteria_used', 'match', 'search_criteria'),
+)
+# Extra columns filled in for results whose address came from an endpoint
+ENDPOINT_FIELDS = (
+    ('endpoint_type', 'address', 'endpointType'),
+    ('endpoint_type_desc', 'address', 'endpointTypeDescription'),
+    ('endpoint', 'address', 'endpoint'),
+    ('affiliation_name', 'address', 'affiliationName'),
+    ('content_other_desc', 'address', 'contentOtherDescription'),
+)
+INSTITUTION_COLUMNS = [name for name, _, _ in INSTITUTION_FIELDS]
+INDIVIDUAL_COLUMNS = [name for name, _, _ in INDIVIDUAL_FIELDS]
+ENDPOINT_COLUMNS = [name for name, _, _ in ENDPOINT_FIELDS]
+
+def build_result_values(fields, match: Dict, addr: Dict, addr_type: str) -> List:
+    """Read the values for the given output schema from a match and its chosen address"""
+    sources = {
+        'match': match,
+        'basic': match['basic'],
+        'address': addr,
+        'taxonomy': match['taxonomies'][0] if match.get('taxonomies') else {},
+        'result': {'address_type': addr_type},
+    }
+    return [sources[source].get(key, '') for _, source, key in fields]
+
+class RateLimiter:
+    """Thread-safe token bucket allowing `max_rate` requests per `time_period` seconds"""
+
+    def __init__(self, max_rate: float, time_period: float = 1.0):
+        self.rate = max_rate / time_period
+        self.capacity = max_rate
+        self.tokens = max_rate
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def acquire(self):
+        """Block until a request may be sent"""
+        while True:
+            with self.lock:
+                self._refill()
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+    def defer(self, seconds: float):
+        """Hold off all further requests for at least `seconds`"""
+        with self.lock:
+            self._refill()
+            self.tokens = min(self.tokens, 1 - seconds * self.rate)
+
+def _backoff_delay(attempt: int) -> float:
+    """Exponential back-off with jitter for the given retry attempt (0-based)"""
+    return min(RETRY_BACKOFF_BASE * 2 ** attempt, RETRY_BACKOFF_CAP) + random.uniform(0, RETRY_BACKOFF_BASE)
+
+def _retry_after(response: requests.Response):
+    """Seconds to wait from a Retry-After header, or None if absent/unparseable"""
+    try:
+        return min(max(float(response.headers['Retry-After']), 0.0), RETRY_BACKOFF_CAP)
+    except (KeyError, ValueError):
+        return None
+
+def _rate_limit_reset(response: requests.Response):
+    """Seconds until the rate-limit window resets if the server reports none remaining"""
+    try:
+        if int(response.headers['RateLimit-Remaining']) > 0:
+            return None
+        return min(max(float(response.headers['RateLimit-Reset']), 0.0), RETRY_BACKOFF_CAP)
+    except (KeyError, ValueError):
+        return None
+
+def _present(value) -> bool:
+    """Check that a provider field holds a usable value (not None, NaN, or blank)"""
+    # value == value is False only for NaN, which avoids a pd.isna dispatch
+    return (value is not None and value is not pd.NA and value == value
+            and str(value).strip() != '')
+
+@lru_cache(maxsize=TEXT_CACHE_SIZE)
+def _normalize_ascii(text: str) -> str:
+    """Strip accents from non-ASCII text, collapse whitespace and trim"""
+    # Normalize unicode characters (é -> e, ó -> o, etc.)
+    text = unicodedata.normalize('NFKD', text).encode('ASCII', 'ignore').decode('ASCII')
+    # Remove multiple spaces and trim
+    return ' '.join(text.split())
 
 class TextCleaner:
     @staticmethod
     def clean_text(text: str) -> str:
         """Clean text by removing extra spaces, special characters, and trimming"""
-        if pd.isna(text):
+        if not _present(text):
             return ""
         # Convert to string if not already
         text = str(text)
-        # Normalize unicode characters (é -> e, ó -> o, etc.)
-        text = unicodedata.normalize('NFKD', text).encode('ASCII', 'ignore').decode('ASCII')
-        # Remove multiple spaces and trim
-        text = ' '.join(text.split())
-        # Remove leading/trailing spaces
-        return text.strip()
+        # Plain ASCII (the common case) has nothing to normalize
+        if text.isascii():
+            return ' '.join(text.split())
+        return _normalize_ascii(text)
+
+    @staticmethod
+    def clean_text_series(series: pd.Series) -> pd.Series:
+        """
+        Vectorized clean_text over a whole column: strips accents, collapses
+        whitespace and trims, with missing values becoming empty strings.
+        """
+        return (series.astype('string')
+                .str.normalize('NFKD')
+                .str.encode('ascii', 'ignore')
+                .str.decode('ascii')
+                .str.replace(r'\s+', ' ', regex=True)
+                .str.strip()
+                .fillna('')
+                .astype(object))
 
     @staticmethod
     def clean_zip(zip_code: str) -> str:
         """Clean ZIP code by removing extra characters and taking only first 5 digits"""
-        if pd.isna(zip_code):
+        if not _present(zip_code):
             return ""
         zip_code = str(zip_code)
-        # Remove any non-digit characters
-        zip_code = ''.join(filter(str.isdigit, zip_code))
-        # Take only first 5 digits
-        return zip_code[:5]
+        # Most ZIPs already start with five digits (12345, 12345-6789, 123456789)
+        zip5 = zip_code[:5]
+        if zip5.isascii() and zip5.isdigit():
+            return zip5
+        # Remove any non-digit characters and take only first 5 digits
+        if zip_code.isascii():
+            return zip_code.translate(_ASCII_NONDIGIT_DELETE)[:5]
+        return _NONDIGIT_RE.sub('', zip_code)[:5]
 
 class NPILookup:
-    def __init__(self):
+    def __init__(self, cache_dir: str = None, force_refresh: bool = False,
+                 max_concurrent_requests: int = MAX_CONCURRENT_REQUESTS,
+                 max_requests_per_second: float = MAX_REQUESTS_PER_SECOND,
+                 memory_cache_records: int = MEMORY_CACHE_RECORDS):
         self.base_url = "https://npiregistry.cms.hhs.gov/api/"
         self.version = "2.1"
+        # Maximum number of results the registry returns per request
+        self.limit = 200
         self.text_cleaner = TextCleaner()
-        # List of US states for validation
-        self.us_states = set([
-            'AL', 'AK', 'AZ', 'AR', 'CA', 'CO', 'CT', 'DE', 'FL', 'GA',
-            'HI', 'ID', 'IL', 'IN', 'IA', 'KS', 'KY', 'LA', 'ME', 'MD',
-            'MA', 'MI', 'MN', 'MS', 'MO', 'MT', 'NE', 'NV', 'NH', 'NJ',
-            'NM', 'NY', 'NC', 'ND', 'OH', 'OK', 'OR', 'PA', 'RI', 'SC',
-            'SD', 'TN', 'TX', 'UT', 'VT', 'VA', 'WA', 'WV', 'WI', 'WY',
-            'DC', 'PR'
-        ])
+        # Registry responses persisted across runs (requires diskcache, off unless
+        # cache_dir is given); force_refresh skips reads but still stores
+        self.disk_cache = None
+        if cache_dir and Cache is not None:
+            self.disk_cache = Cache(cache_dir, size_limit=CACHE_SIZE_LIMIT,
+                                    eviction_policy='least-recently-used')
+        self.force_refresh = force_refresh
+        # Registry responses for this process, least recently used evicted first
+        # once they hold more than memory_cache_records records in total
+        self.memory_cache = OrderedDict()
+        self.memory_cache_records = memory_cache_records
+        self.memory_cache_total = 0
+        self.memory_cache_lock = threading.Lock()
+        # Futures for registry requests still in flight, by cache key, so threads
+        # asking for the same query wait for one request instead of sending their own
+        self.pending_requests = {}
+        # Bounds in-flight registry requests across all threads using this lookup
+        self.request_slots = threading.BoundedSemaphore(max_concurrent_requests)
+        # Runs the extra searches a lookup starts alongside its own; one pool per
+        # NPILookup, sized to the request slots those searches would wait on anyway
+        self.executor = ThreadPoolExecutor(max_workers=max_concurrent_requests)
+        # Spaces requests out so concurrent lookups stay under the registry's limits
+        self.rate_limiter = RateLimiter(max_requests_per_second)
+        # One keep-alive connection per request slot, shared by all threads; server
+        # errors are retried here, rate limiting and connection errors in _get
+        self.session = requests.Session()
+        self.session.headers['User-Agent'] = USER_AGENT
+        self.session.mount('https://', HTTPAdapter(
+            pool_connections=1,
+            pool_maxsize=max_concurrent_requests,
+            max_retries=Retry(total=MAX_RETRIES, connect=0, read=0,
+                              status_forcelist=RETRY_STATUS_CODES,
+                              backoff_factor=RETRY_BACKOFF_BASE, raise_on_status=False,
+                              # Leave 429 + Retry-After to _get and the shared rate limiter
+                              respect_retry_after_header=False),
+        ))
+
+    def close(self):
+        """Close the search thread pool, the on-disk cache and the HTTP session"""
+        self.executor.shutdown()
+        if self.disk_cache is not None:
+            self.disk_cache.close()
+        self.session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _memory_cache_put(self, key: str, results: List[Dict]):
+        """Store results for `key`, evicting the least recently used entries"""
+        with self.memory_cache_lock:
+            previous = self.memory_cache.pop(key, None)
+            if previous is not None:
+                self.memory_cache_total -= max(len(previous), 1)
+            self.memory_cache[key] = results
+            self.memory_cache_total += max(len(results), 1)
+            while self.memory_cache_total > self.memory_cache_records and len(self.memory_cache) > 1:
+                _, evicted = self.memory_cache.popitem(last=False)
+                self.memory_cache_total -= max(len(evicted), 1)
+
+    def _get(self, params: Dict) -> requests.Response:
+        """
+        Send a GET request to the registry API within the rate limit.
+        Rate-limited (HTTP 429) responses, connection errors and timeouts are
+        retried with exponential back-off, honoring the server's Retry-After header.
+        """
+        for attempt in range(MAX_RETRIES + 1):
+            self.rate_limiter.acquire()
+            try:
+                with self.request_slots:
+                    response = self.session.get(self.base_url, params=params,
+                                                timeout=REQUEST_TIMEOUT)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                if attempt == MAX_RETRIES:
+                    raise
+                delay = _backoff_delay(attempt)
+                logger.debug("Connection error or timeout (%s), retrying in %.2fs", e, delay)
+            else:
+                # Pause everyone when the server reports its rate-limit window is used up
+                reset = _rate_limit_reset(response)
+                if reset is not None:
+                    self.rate_limiter.defer(reset)
+
+                if response.status_code != 429 or attempt == MAX_RETRIES:
+                    return response
+                delay = _retry_after(response)
+                if delay is None:
+                    delay = _backoff_delay(attempt)
+                self.rate_limiter.defer(delay)
+                logger.debug("Rate limited by the registry, retrying in %.2fs", delay)
+            time.sleep(delay)
 
     def is_us_address(self, state: str, zip_code: str) -> bool:
-        """Check if address is in the US"""
+        """
+        Check if address is in the US.
+        Expects a ZIP code already cleaned by TextCleaner.clean_zip (as search_npi does).
+        """
         if not state or not zip_code:
             return False
-        state = state.upper()
-        return state in self.us_states and len(self.text_cleaner.clean_zip(zip_code)) == 5
+        return state.upper() in US_STATES and len(zip_code) >= 5 and zip_code[:5].isdigit()
 
     def search_npi(self, **kwargs) -> List[Dict]:
         """Search for NPI numbers based on provided criteria."""
@@ -61,7 +517,7 @@ class NPILookup:
             # Clean all text inputs
             cleaned_params = {}
             for k, v in kwargs.items():
-                if v and not pd.isna(v):
+                if _present(v):
                     if k == 'postal_code':
                         cleaned_params[k] = self.text_cleaner.clean_zip(v)
                     else:
@@ -75,27 +531,64 @@ class NPILookup:
 
             params = {
                 'version': self.version,
-                'limit': 200,
+                'limit': self.limit,
                 'pretty': True,
                 **cleaned_params
             }
 
-            response = requests.get(self.base_url, params=params)
-            response.raise_for_status()
-            data = response.json()
-
-            if not isinstance(data, dict) or 'result_count' not in data:
-                print(f"Warning: Unexpected API response format for parameters {cleaned_params}")
-                return []
+            # Key on the cleaned params so equivalent inputs share a cache entry
+            cache_key = json.dumps([self.version, self.limit, sorted(cleaned_params.items())])
+            with self.memory_cache_lock:
+                cached = self.memory_cache.get(cache_key)
+                if cached is not None:
+                    self.memory_cache.move_to_end(cache_key)
+                    return cached
+                # Only the first thread to miss fetches; the others wait for its result
+                pending = self.pending_requests.get(cache_key)
+                fetching = pending is None
+                if fetching:
+                    pending = self.pending_requests[cache_key] = Future()
+            if not fetching:
+                return pending.result()
+
+            try:
+                results = self._fetch_results(cache_key, params, cleaned_params)
+            except Exception as e:
+                pending.set_exception(e)
+                raise
+            else:
+                pending.set_result(results)
+                return results
+            finally:
+                with self.memory_cache_lock:
+                    del self.pending_requests[cache_key]
 
-            if data['result_count'] > 0:
-                return data['results']
+        except Exception as e:
+            logger.warning("Error searching with parameters %s: %s", cleaned_params, e)
             return []
 
-        except Exception as e:
-            print(f"Warning: Error searching with parameters {cleaned_params}: {str(e)}")
+    def _fetch_results(self, cache_key: str, params: Dict, cleaned_params: Dict) -> List[Dict]:
+        """Read a query's results from the disk cache or the registry, caching them"""
+        if self.disk_cache is not None and not self.force_refresh:
+            cached = self.disk_cache.get(cache_key)
+            if cached is not None:
+                self._memory_cache_put(cache_key, cached)
+                return cached
+
+        response = self._get(params)
+        response.raise_for_status()
+        data = _json_loads(response.content)
+
+        if not isinstance(data, dict) or 'result_count' not in data:
+            logger.warning("Unexpected API response format for parameters %s", cleaned_params)
             return []
 
+        results = data['results'] if data['result_count'] > 0 else []
+        self._memory_cache_put(cache_key, results)
+        if self.disk_cache is not None:
+            self.disk_cache.set(cache_key, results, expire=CACHE_EXPIRE_SECONDS)
+        return results
+
     def search_with_organization_name(self, institution_name: str, state: str = None) -> List[Dict]:
         """
         Search specifically for an organization by name and optionally state.
@@ -109,21 +602,27 @@ class NPILookup:
             }
 
             # Add state if provided
-            if state and not pd.isna(state):
+            if _present(state):
                 search_params['state'] = state
 
-            # Perform the search
-            results = self.search_npi(**search_params)
+            if 'state' not in search_params:
+                # Without a state there is no broader search to fall back to
+                return self.search_npi(**search_params)
 
-            # If no results with exact parameters, try a broader search
-            if not results:
-                # Try with just the organization name
-                results = self.search_npi(organization_name=institution_name, enumeration_type='org')
+            # Start the name-only fallback on the shared pool while the state-scoped
+            # search runs here, so a miss on the first doesn't cost a second
+            # sequential round-trip
+            broad = self.executor.submit(self.search_npi, organization_name=institution_name, enumeration_type='org')
+            narrow = self.search_npi(**search_params)
 
-            return results
+            # Prefer the state-scoped results, fall back to the broader search
+            if narrow:
+                broad.cancel()
+                return narrow
+            return broad.result()
 
         except Exception as e:
-            print(f"Warning: Error searching for institution {institution_name}: {str(e)}")
+            logger.warning("Error searching for institution %s: %s", institution_name, e)
             return []
 
     def search_with_multiple_combinations(self, provider_data: Dict) -> List[Dict]:
@@ -134,8 +633,19 @@ class NPILookup:
         all_matches = []
         seen_npis = set()
 
+        # Which provider fields hold a usable value, worked out once per row
+        # instead of inside every verify call
+        p_has = {k: _present(v) for k, v in provider_data.items()}
+        # Upper-cased provider fields compared by the verifiers, computed once per row
+        p = ProviderFields(
+            *(str(provider_data.get(field, '')).upper()
+              for field in ('first_name', 'last_name', 'city', 'state')),
+            has_first_name=bool(p_has.get('first_name')),
+            verify_location=LOCATION_VERIFIERS[bool(p_has.get('city')), bool(p_has.get('state'))]
+        )
+
         # Check if this is an institution search
-        if 'institution_name' in provider_data and provider_data.get('institution_name'):
+        if p_has.get('institution_name'):
             # This is an institutional search
             institution_matches = self.search_with_organization_name(
                 provider_data.get('institution_name'),
@@ -159,190 +669,76 @@ class NPILookup:
         # If this is not an institution search or no institution matches were found,
         # fall back to the original search strategy for individual providers
 
-        # Define search combinations from most specific to least specific for individuals
-        search_strategies = [
-            # Strategy 1: First name, last name, city, and state (most specific)
-            {
-                'required_fields': ['first_name', 'last_name', 'city', 'state'],
-                'params': {
-                    'first_name': provider_data.get('first_name'),
-                    'last_name': provider_data.get('last_name'),
-                    'city': provider_data.get('city'),
-                    'state': provider_data.get('state')
-                },
-                'verify': lambda m, p: (
-                    m['basic'].get('first_name', '').upper() == str(p.get('first_name', '')).upper() and
-                    m['basic'].get('last_name', '').upper() == str(p.get('last_name', '')).upper() and
-                    any(a.get('city', '').upper() == str(p.get('city', '')).upper() and
-                        a.get('state', '').upper() == str(p.get('state', '')).upper()
-                        for a in m['addresses'])
-                )
-            },
-            # Strategy 2: First name, last name, and state
-            {
-                'required_fields': ['first_name', 'last_name', 'state'],
-                'params': {
-                    'first_name': provider_data.get('first_name'),
-                    'last_name': provider_data.get('last_name'),
-                    'state': provider_data.get('state')
-                },
-                'verify': lambda m, p: (
-                    m['basic'].get('first_name', '').upper() == str(p.get('first_name', '')).upper() and
-                    m['basic'].get('last_name', '').upper() == str(p.get('last_name', '')).upper() and
-                    any(a.get('state', '').upper() == str(p.get('state', '')).upper()
-                        for a in m['addresses'])
-                )
-            },
-            # Strategy 3: Last name, city, and state
-            {
-                'required_fields': ['last_name', 'city', 'state'],
-                'params': {
-                    'last_name': provider_data.get('last_name'),
-                    'city': provider_data.get('city'),
-                    'state': provider_data.get('state')
-                },
-                'verify': lambda m, p: (
-                    m['basic'].get('last_name', '').upper() == str(p.get('last_name', '')).upper() and
-                    any(a.get('city', '').upper() == str(p.get('city', '')).upper() and
-                        a.get('state', '').upper() == str(p.get('state', '')).upper()
-                        for a in m['addresses'])
-                )
-            },
-            # Strategy 4: Last name and state
-            {
-                'required_fields': ['last_name', 'state'],
-                'params': {
-                    'last_name': provider_data.get('last_name'),
-                    'state': provider_data.get('state')
-                },
-                'verify': lambda m, p: (
-                    m['basic'].get('last_name', '').upper() == str(p.get('last_name', '')).upper() and
-                    any(a.get('state', '').upper() == str(p.get('state', '')).upper()
-                        for a in m['addresses'])
-                )
-            },
-            # Strategy 5: First name and last name with location verification
-            {
-                'required_fields': ['first_name', 'last_name'],
-                'params': {
-                    'first_name': provider_data.get('first_name'),
-                    'last_name': provider_data.get('last_name')
-                },
-                'verify': lambda m, p: (
-                    # First verify name match
-                    m['basic'].get('first_name', '').upper() == str(p.get('first_name', '')).upper() and
-                    m['basic'].get('last_name', '').upper() == str(p.get('last_name', '')).upper() and
-                    # Only verify location if city or state was provided (check for valid non-NaN values)
-                    (
-                        # If city+state provided (both valid non-NaN), check for match
-                        ((p.get('city') and not pd.isna(p.get('city')) and str(p.get('city')).strip()) and
-                         (p.get('state') and not pd.isna(p.get('state')) and str(p.get('state')).strip()) and any(
-                            a.get('city', '').upper() == str(p.get('city', '')).upper() and
-                            a.get('state', '').upper() == str(p.get('state', '')).upper()
-                            for a in (
-                                m.get('addresses', []) +
-                                m.get('practiceLocations', []) +
-                                m.get('endpoints', [])
-                            )
-                        ))
-                        or
-                        # If only state provided (valid non-NaN), check for state match
-                        ((p.get('state') and not pd.isna(p.get('state')) and str(p.get('state')).strip()) and
-                         not (p.get('city') and not pd.isna(p.get('city')) and str(p.get('city')).strip()) and any(
-                            a.get('state', '').upper() == str(p.get('state', '')).upper()
-                            for a in (
-                                m.get('addresses', []) +
-                                m.get('practiceLocations', []) +
-                                m.get('endpoints', [])
-                            )
-                        ))
-                        or
-                        # If no location info provided (both are NaN/empty), accept name match only
-                        (not (p.get('city') and not pd.isna(p.get('city')) and str(p.get('city')).strip()) and
-                         not (p.get('state') and not pd.isna(p.get('state')) and str(p.get('state')).strip()))
-                    )
-                )
-            },
-            # Strategy 6: Last name only (broadest search - limited to 10 results)
-            {
-                'required_fields': ['last_name'],
-                'params': {
-                    'last_name': provider_data.get('last_name')
-                },
-                'verify': lambda m, p: (
-                    # Verify last name match
-                    m['basic'].get('last_name', '').upper() == str(p.get('last_name', '')).upper() and
-                    # If first name provided (valid non-NaN), verify it matches
-                    (not (p.get('first_name') and not pd.isna(p.get('first_name')) and str(p.get('first_name')).strip()) or
-                     m['basic'].get('first_name', '').upper() == str(p.get('first_name', '')).upper()) and
-                    # Verify location if provided (check for valid non-NaN values)
-                    (
-                        # If city+state provided (both valid non-NaN), check for match
-                        ((p.get('city') and not pd.isna(p.get('city')) and str(p.get('city')).strip()) and
-                         (p.get('state') and not pd.isna(p.get('state')) and str(p.get('state')).strip()) and any(
-                            a.get('city', '').upper() == str(p.get('city', '')).upper() and
-                            a.get('state', '').upper() == str(p.get('state', '')).upper()
-                            for a in (
-                                m.get('addresses', []) +
-                                m.get('practiceLocations', []) +
-                                m.get('endpoints', [])
-                            )
-                        ))
-                        or
-                        # If only state provided (valid non-NaN), check for state match
-                        ((p.get('state') and not pd.isna(p.get('state')) and str(p.get('state')).strip()) and
-                         not (p.get('city') and not pd.isna(p.get('city')) and str(p.get('city')).strip()) and any(
-                            a.get('state', '').upper() == str(p.get('state', '')).upper()
-                            for a in (
-                                m.get('addresses', []) +
-                                m.get('practiceLocations', []) +
-                                m.get('endpoints', [])
-                            )
-                        ))
-                        or
-                        # If no location info provided (both are NaN/empty), accept name match only
-                        (not (p.get('city') and not pd.isna(p.get('city')) and str(p.get('city')).strip()) and
-                         not (p.get('state') and not pd.isna(p.get('state')) and str(p.get('state')).strip()))
-                    )
-                ),
-                'limit': 10  # Limit to first 10 results for last name only searches
-            }
+        # Every strategy narrows one of two broad searches: last name + state
+        # (strategies 1-4) or last name alone (strategies 5-6). Fetch each broad
+        # candidate pool at most once and verify the strategies it covers locally.
+        pools = [
+            {k: provider_data[k] for k in fields if p_has.get(k)}
+            for fields in (('last_name', 'state'), ('last_name',))
         ]
+        fetched_pools = {}
+
+        # Search params for each strategy the provider has the fields for, with
+        # the most specific pool whose params that strategy narrows.
+        # Treat empty strings, NaN values, and whitespace-only strings as missing
+        planned = {}
+        for strategy_idx, strategy in enumerate(SEARCH_STRATEGIES, 1):
+            if all(p_has.get(field) for field in strategy['required_fields']):
+                search_params = {field: provider_data[field] for field in strategy['required_fields']}
+                pool_idx = next(
+                    i for i, pool in enumerate(pools)
+                    if all(search_params.get(k) == v for k, v in pool.items())
+                )
+                planned[strategy_idx] = (search_params, pool_idx)
 
-        for strategy_idx, strategy in enumerate(search_strategies, 1):
+        # Strategies whose pool came back truncated get their own searches,
+        # started together and consumed in priority order
+        own_searches = {}
+        for strategy_idx, strategy in enumerate(SEARCH_STRATEGIES, 1):
             # Check if we have all required fields for this strategy
-            # Treat empty strings, NaN values, and whitespace-only strings as missing
-            has_required = all(
-                provider_data.get(field) and
-                not pd.isna(provider_data.get(field)) and
-                str(provider_data.get(field)).strip() != ''
-                for field in strategy['required_fields']
-            )
+            has_required = strategy_idx in planned
 
-            print(f"  Strategy {strategy_idx}: Required fields {strategy['required_fields']}, Has all: {has_required}")
+            logger.debug("  Strategy %d: Required fields %s, Has all: %s",
+                         strategy_idx, strategy['required_fields'], has_required)
 
             if not has_required:
                 continue
 
-            # Remove None, empty, or whitespace-only values from params
-            search_params = {
-                k: v for k, v in strategy['params'].items()
-                if v and not pd.isna(v) and str(v).strip() != ''
-            }
-
-            print(f"    Searching with params: {search_params}")
-            matches = self.search_npi(**search_params)
-            print(f"    API returned {len(matches)} raw matches")
+            search_params, pool_idx = planned[strategy_idx]
+            pool_params = pools[pool_idx]
+            if pool_idx not in fetched_pools:
+                logger.debug("    Fetching candidate pool with params: %s", pool_params)
+                pool_matches = self.search_npi(**pool_params)
+                fetched_pools[pool_idx] = (pool_matches, pack_candidates(pool_matches))
+                logger.debug("    API returned %d raw matches", len(pool_matches))
+
+                # A full page means the registry truncated the pool, so the
+                # narrower strategies it covers need their own searches
+                if len(pool_matches) >= self.limit:
+                    for later_idx, (params, later_pool_idx) in planned.items():
+                        if (later_idx >= strategy_idx and later_pool_idx == pool_idx
+                                and params != pool_params):
+                            own_searches[later_idx] = self.executor.submit(self.search_npi, **params)
+            pool_matches, pool_candidates = fetched_pools[pool_idx]
+
+            if strategy_idx not in own_searches:
+                logger.debug("    Verifying against candidate pool for params: %s", search_params)
+                matches, candidates = pool_matches, pool_candidates
+            else:
+                logger.debug("    Searching with params: %s", search_params)
+                matches = own_searches[strategy_idx].result()
+                candidates = pack_candidates(matches)
+                logger.debug("    API returned %d raw matches", len(matches))
 
             # Process matches
             strategy_matches = []
             match_limit = strategy.get('limit', None)  # Get limit if specified
 
-            for match in matches:
+            for match, candidate in zip(matches, candidates):
                 npi = match['number']
 
                 # Only include matches that satisfy the current strategy's criteria
-                if npi not in seen_npis and strategy['verify'](match, provider_data):
+                if npi not in seen_npis and strategy['verify'](candidate, p):
                     seen_npis.add(npi)
                     strategy_matches.append({
                         'search_criteria': str(search_params),
@@ -355,49 +751,68 @@ class NPILookup:
 
             # If this strategy found any matches, use only these matches and stop searching
             if strategy_matches:
-                print(f"    [SUCCESS] Strategy {strategy_idx} found {len(strategy_matches)} verified matches. Stopping search.")
+                logger.debug("    [SUCCESS] Strategy %d found %d verified matches. Stopping search.",
+                             strategy_idx, len(strategy_matches))
                 all_matches.extend(strategy_matches)
+                # Searches for the less specific strategies are no longer needed;
+                # any already running finish in the background and fill the caches
+                for future in own_searches.values():
+                    future.cancel()
                 break
             else:
-                print(f"    [FAIL] No verified matches for this strategy")
-
-            # Add small delay between searches
-            time.sleep(0.1)
+                logger.debug("    [FAIL] No verified matches for this strategy")
 
         return all_matches
 
+    def search_many(self, providers: List[Dict], max_workers: int = MAX_WORKERS,
+                    progress_callback=None) -> List[List[Dict]]:
+        """
+        Run search_with_multiple_combinations for each provider on up to
+        `max_workers` threads, returning the matches in the same order.
+        progress_callback gets the fraction of providers finished so far.
+        """
+        results = [None] * len(providers)
+        # The lookups are dominated by registry round-trips, so run them on a thread
+        # pool; progress is reported as each provider finishes
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = {
+                executor.submit(self.search_with_multiple_combinations, provider_data): i
+                for i, provider_data in enumerate(providers)
+            }
+            for completed, future in enumerate(as_completed(futures), 1):
+                results[futures[future]] = future.result()
+                if completed % PROGRESS_LOG_INTERVAL == 0 or completed == len(futures):
+                    logger.info("Looked up %d of %d providers", completed, len(futures))
+                if progress_callback:
+                    progress_callback(completed / len(futures))
+        return results
+
 def detect_provider_type(df: pd.DataFrame) -> str:
     """
     Detect whether the CSV contains individual providers or institutions
     based on the columns present in the dataframe.
     """
     # Check for institution name column
-    if any(col in df.columns for col in ['institution_name', 'organization_name', 'facility_name', 'org_name']):
+    if not INSTITUTION_NAME_COLUMNS.isdisjoint(df.columns):
         return 'institution'
 
     # Check for last name + first name columns (common for individual providers)
     if 'last_name' in df.columns and 'first_name' in df.columns:
         return 'individual'
 
-    # If we can't clearly determine, check for more columns
-    institution_indicators = ['facility', 'hospital', 'clinic', 'center', 'institution', 'organization']
-
-    # Look for any column names that might indicate institutions
-    for col in df.columns:
-        # Skip None or non-string column names
-        if not isinstance(col, str):
-            continue
-        for indicator in institution_indicators:
-            if indicator.lower() in col.lower():
-                return 'institution'
+    # If we can't clearly determine, look for any column names that might
+    # indicate institutions (skipping None or non-string column names)
+    if any(INSTITUTION_INDICATOR_RE.search(col) for col in df.columns if isinstance(col, str)):
+        return 'institution'
 
     # Default to individual if we can't determine
     return 'individual'
 
-def process_dataframe(df: pd.DataFrame, column_mappings: Dict, progress_callback=None):
+def _prepare_lookup(df: pd.DataFrame):
     """
-    Process a DataFrame to find NPI matches.
-    This is a modified version of the original process_csv function.
+    Check the DataFrame has the columns its provider type needs and clean its
+    search fields. Returns the key columns, the cleaned lookup DataFrame, and
+    the output schema (fields and column names).
     """
     provider_type = detect_provider_type(df)
 
@@ -410,34 +825,61 @@ def process_dataframe(df: pd.DataFrame, column_mappings: Dict, progress_callback
     if missing_columns:
         raise ValueError(f"Missing required columns for {provider_type}s: {', '.join(missing_columns)}")
 
-    npi_lookup = NPILookup()
-    all_results = []
-    total_rows = len(df)
-
-    for idx, row in df.iterrows():
-        if progress_callback:
-            progress_callback(idx / total_rows)
-
-        provider_data = {}
-        if provider_type == 'institution':
-            provider_data['institution_name'] = row.get('institution_name', '')
-            if 'state' in df.columns:
-                provider_data['state'] = row.get('state', '')
-        else:
-            provider_data['last_name'] = row.get('last_name', '')
-            if 'first_name' in df.columns:
-                provider_data['first_name'] = row.get('first_name', '')
-            if 'city' in df.columns:
-                provider_data['city'] = row.get('city', '')
-            if 'state' in df.columns:
-                provider_data['state'] = row.get('state', '')
-
-        print(f"\n=== Row {idx + 1} ===")
-        print(f"Provider Data: {provider_data}")
-
-        matches = npi_lookup.search_with_multiple_combinations(provider_data)
+    lookup_fields = {
+        "individual": ["last_name", "first_name", "city", "state"],
+        "institution": ["institution_name", "state"]
+    }
 
-        print(f"Number of matches found: {len(matches)}")
+    # Clean the search fields a whole column at a time (the input_ columns still
+    # echo the original values). Rows with the same cleaned provider data share
+    # one lookup.
+    key_columns = [col for col in lookup_fields[provider_type] if col in df.columns]
+    lookup_df = pd.DataFrame(
+        {col: TextCleaner.clean_text_series(df[col]) for col in key_columns},
+        index=df.index
+    )
+
+    if provider_type == 'institution':
+        return key_columns, lookup_df, INSTITUTION_FIELDS, INSTITUTION_COLUMNS
+    return key_columns, lookup_df, INDIVIDUAL_FIELDS, INDIVIDUAL_COLUMNS
+
+def _lookup_results(df: pd.DataFrame, lookup_df: pd.DataFrame, key_columns: List[str],
+                    output_fields, output_columns, npi_lookup: 'NPILookup',
+                    max_workers: int, progress_callback=None):
+    """
+    Look up the providers of `df` (whose cleaned search fields are in
+    `lookup_df`) and return the result columns, including the endpoint columns,
+    and whether any result came from an endpoint.
+    """
+    row_keys = list(zip(*(lookup_df[col] for col in key_columns)))
+
+    # Build the search inputs once per distinct provider from the key columns
+    # (the lookup fields this file has); every row is matched back to its
+    # provider's results through its key
+    unique_providers = {}
+    for row_key in lookup_df.drop_duplicates().itertuples(index=False, name=None):
+        provider_data = dict(zip(key_columns, row_key))
+        logger.debug("Provider data: %s", provider_data)
+        unique_providers[row_key] = provider_data
+
+    matches_by_key = dict(zip(
+        unique_providers,
+        npi_lookup.search_many(list(unique_providers.values()), max_workers, progress_callback)
+    ))
+
+    # Results are accumulated column by column and turned into a DataFrame once;
+    # input_ columns are filled from the input rows each result came from
+    out_cols = {name: [] for name in output_columns}
+    out_cols.update({f"input_{col}": [] for col in df.columns})
+    out_cols.update({name: [] for name in ENDPOINT_COLUMNS})
+    result_columns = [out_cols[name] for name in output_columns]
+    endpoint_columns = [out_cols[name] for name in ENDPOINT_COLUMNS]
+    has_endpoints = False
+    input_positions = []
+
+    for idx, row_key in enumerate(row_keys):
+        matches = matches_by_key[row_key]
+        logger.debug("Row %d: %d matches found", idx + 1, len(matches))
 
         if matches:
             # Track NPIs per row to avoid duplicates within the same person's results
@@ -447,84 +889,93 @@ def process_dataframe(df: pd.DataFrame, column_mappings: Dict, progress_callback
                     continue
 
                 seen_npis_this_row.add(match['number'])
-                addresses_to_process = (
-                    [(addr, 'main') for addr in match['addresses']] +
-                    [(loc, 'practice') for loc in match.get('practiceLocations', [])] +
-                    [(endpoint, 'endpoint') for endpoint in match.get('endpoints', [])]
-                )
+                # Report the first address, falling back to a practice location or endpoint
+                if match['addresses']:
+                    addr, addr_type = match['addresses'][0], 'main'
+                elif match.get('practiceLocations'):
+                    addr, addr_type = match['practiceLocations'][0], 'practice'
+                elif match.get('endpoints'):
+                    addr, addr_type = match['endpoints'][0], 'endpoint'
+                else:
+                    continue
+
+                values = build_result_values(output_fields, match, addr, addr_type)
+                for column, value in zip(result_columns, values):
+                    column.append(value)
+
+                # Remember the input row so its data can be added with an 'input_' prefix
+                input_positions.append(idx)
+
+                if addr_type == 'endpoint':
+                    has_endpoints = True
+                    values = build_result_values(ENDPOINT_FIELDS, match, addr, addr_type)
+                else:
+                    values = (None,) * len(ENDPOINT_COLUMNS)
+
+                for column, value in zip(endpoint_columns, values):
+                    column.append(value)
 
-                if addresses_to_process:
-                    addr, addr_type = addresses_to_process[0]
-
-                    # Build result with consistent column order
-                    result = {}
-
-                    if provider_type == 'institution':
-                        # Institution output order
-                        result = {
-                            'organization_name': match['basic'].get('organization_name', ''),
-                            'npi': match['number'],
-                            'address': addr.get('address_1', ''),
-                            'address_2': addr.get('address_2', ''),
-                            'city': addr.get('city', ''),
-                            'state': addr.get('state', ''),
-                            'zip': addr.get('postal_code', ''),
-                            'phone': addr.get('telephone_number', ''),
-                            'fax': addr.get('fax_number', ''),
-                            'organizational_subpart': match['basic'].get('organizational_subpart', ''),
-                            'authorized_official_first_name': match['basic'].get('authorized_official_first_name', ''),
-                            'authorized_official_last_name': match['basic'].get('authorized_official_last_name', ''),
-                            'authorized_official_title': match['basic'].get('authorized_official_title', ''),
-                            'status': match['basic'].get('status', ''),
-                            'taxonomy_desc': match['taxonomies'][0].get('desc', '') if match.get('taxonomies') else '',
-                            'taxonomy_group': match['taxonomies'][0].get('taxonomy_group', '') if match.get('taxonomies') else '',
-                            'address_type': addr_type,
-                            'search_criteria_used': match['search_criteria'],
-                        }
-                    else: # Individual
-                        # Individual output order - First Name, Last Name, NPI, Address, City, State, ZIP, etc.
-                        result = {
-                            'first_name': match['basic'].get('first_name', ''),
-                            'last_name': match['basic'].get('last_name', ''),
-                            'npi': match['number'],
-                            'address': addr.get('address_1', ''),
-                            'address_2': addr.get('address_2', ''),
-                            'city': addr.get('city', ''),
-                            'state': addr.get('state', ''),
-                            'zip': addr.get('postal_code', ''),
-                            'phone': addr.get('telephone_number', ''),
-                            'fax': addr.get('fax_number', ''),
-                            'middle_name': match['basic'].get('middle_name', ''),
-                            'name_prefix': match['basic'].get('name_prefix', ''),
-                            'name_suffix': match['basic'].get('name_suffix', ''),
-                            'credential': match['basic'].get('credential', ''),
-                            'gender': match['basic'].get('gender', ''),
-                            'sole_proprietor': match['basic'].get('sole_proprietor', ''),
-                            'status': match['basic'].get('status', ''),
-                            'taxonomy_desc': match['taxonomies'][0].get('desc', '') if match.get('taxonomies') else '',
-                            'taxonomy_group': match['taxonomies'][0].get('taxonomy_group', '') if match.get('taxonomies') else '',
-                            'license_number': match['taxonomies'][0].get('license', '') if match.get('taxonomies') else '',
-                            'license_state': match['taxonomies'][0].get('state', '') if match.get('taxonomies') else '',
-                            'address_type': addr_type,
-                            'search_criteria_used': match['search_criteria'],
-                        }
-
-                    # Add original input data at the end with 'input_' prefix
-                    for col in df.columns:
-                        result[f"input_{col}"] = row[col]
-
-                    if addr_type == 'endpoint':
-                        result.update({
-                            'endpoint_type': addr.get('endpointType', ''),
-                            'endpoint_type_desc': addr.get('endpointTypeDescription', ''),
-                            'endpoint': addr.get('endpoint', ''),
-                            'affiliation_name': addr.get('affiliationName', ''),
-                            'content_other_desc': addr.get('contentOtherDescription', ''),
-                        })
-
-                    all_results.append(result)
+    # Add original input data after the result columns, one column at a time
+    for col in df.columns:
+        out_cols[f"input_{col}"] = df[col].take(input_positions).reset_index(drop=True)
+
+    return out_cols, has_endpoints
+
+def iter_process_dataframe(df: pd.DataFrame, column_mappings: Dict, progress_callback=None,
+                           max_workers: int = MAX_WORKERS, chunk_size: int = CHUNK_SIZE,
+                           cache_dir: str = None, force_refresh: bool = False):
+    """
+    Process a DataFrame to find NPI matches `chunk_size` input rows at a time,
+    yielding each chunk's results as soon as its lookups finish.
+    Unlike process_dataframe, every chunk includes the endpoint columns.
+    Memory is bounded by one chunk's matches plus the lookup's response cache,
+    which is capped at MEMORY_CACHE_RECORDS records; providers repeated in a
+    later chunk are answered from that cache while their responses are still in it.
+    """
+    key_columns, lookup_df, output_fields, output_columns = _prepare_lookup(df)
+
+    with NPILookup(cache_dir=cache_dir, force_refresh=force_refresh) as npi_lookup:
+        for start in range(0, len(df), chunk_size):
+            stop = min(start + chunk_size, len(df))
+
+            def chunk_progress(fraction, start=start, stop=stop):
+                # Report progress across the whole file, not just this chunk
+                progress_callback((start + fraction * (stop - start)) / len(df))
+
+            out_cols, _ = _lookup_results(
+                df.iloc[start:stop], lookup_df.iloc[start:stop], key_columns,
+                output_fields, output_columns, npi_lookup, max_workers,
+                chunk_progress if progress_callback else None
+            )
+            yield pd.DataFrame(out_cols, copy=False)
 
     if progress_callback:
         progress_callback(1.0)
 
-    return pd.DataFrame(all_results)
\ No newline at end of file
+def process_dataframe(df: pd.DataFrame, column_mappings: Dict, progress_callback=None,
+                      max_workers: int = MAX_WORKERS, cache_dir: str = None,
+                      force_refresh: bool = False):
+    """
+    Process a DataFrame to find NPI matches.
+    This is a modified version of the original process_csv function.
+    Distinct providers are looked up concurrently on up to `max_workers` threads.
+    Registry responses are kept in `cache_dir` between runs when it is given
+    (requires diskcache); force_refresh ignores what is already cached there.
+    """
+    key_columns, lookup_df, output_fields, output_columns = _prepare_lookup(df)
+
+    with NPILookup(cache_dir=cache_dir, force_refresh=force_refresh) as npi_lookup:
+        out_cols, has_endpoints = _lookup_results(
+            df, lookup_df, key_columns, output_fields, output_columns,
+            npi_lookup, max_workers, progress_callback
+        )
+
+    if progress_callback:
+        progress_callback(1.0)
+
+    # Endpoint details are only included when at least one result came from an endpoint
+    if not has_endpoints:
+        for name in ENDPOINT_COLUMNS:
+            del out_cols[name]
+
+    return pd.DataFrame(out_cols, copy=False)